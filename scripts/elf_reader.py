@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Minimal reader for the section, segment and symbol tables of ELF files
+
+Supports 32 and 64 bit files of either endianness. Only the pieces of the
+format needed to size Zephyr binaries are decoded, which is enough to not
+depend on host binutils that may not even understand the target.
+"""
+
+import mmap
+import struct
+import sys
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+PT_LOAD = 1
+STT_SECTION = 3
+STT_FILE = 4
+SHN_UNDEF = 0
+SHN_LORESERVE = 0xff00
+SHN_XINDEX = 0xffff
+
+# (header after e_ident, section header, program header, symbol) layouts
+# for each ELF class, see gen_offset_header/elf.h
+LAYOUTS = {
+    ELFCLASS32 : ("HHIIIIIHHHHHH", "IIIIIIIIII", "IIIIIIII", "IIIBBH"),
+    ELFCLASS64 : ("HHIQQQIHHHHHH", "IIQQQQIIQQ", "IIQQQQQQ", "IBBHQQ"),
+}
+
+
+class ElfError(Exception):
+    pass
+
+
+class Section:
+    """A section header, with the load address objdump would report"""
+    def __init__(self, name, sh_type, flags, addr, offset, size, link):
+        self.name = name
+        self.type = sh_type
+        self.flags = flags
+        self.addr = addr
+        self.offset = offset
+        self.size = size
+        self.link = link
+        self.load_addr = addr
+
+
+class Symbol:
+    """A symbol table entry, with the name of the section defining it"""
+    def __init__(self, name, value, size, sym_type, section):
+        self.name = name
+        self.value = value
+        self.size = size
+        self.type = sym_type
+        self.section = section
+
+
+class ElfFile:
+    """An ELF file mapped into memory, usable as a context manager"""
+
+    def __init__(self, filename):
+        """Constructor
+
+        @param filename Path to the ELF file
+        @raise ElfError if the file isn't a valid ELF file
+        """
+        self.filename = filename
+        with open(filename, "rb") as fp:
+            try:
+                self.data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                raise ElfError("%s is not an ELF binary" % filename)
+
+        try:
+            self._parse()
+        except struct.error:
+            self.close()
+            raise ElfError("%s is truncated" % filename)
+        except ElfError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def _parse(self):
+        data = self.data
+        if data[:4] != b"\x7fELF":
+            raise ElfError("%s is not an ELF binary" % self.filename)
+
+        elf_class = data[4]
+        if elf_class not in LAYOUTS or data[5] not in (ELFDATA2LSB, ELFDATA2MSB):
+            raise ElfError("%s has an unsupported ELF class or encoding" %
+                           self.filename)
+        endian = "<" if data[5] == ELFDATA2LSB else ">"
+        ehdr, shdr, phdr, sym = LAYOUTS[elf_class]
+        self.sym_struct = struct.Struct(endian + sym)
+        self.elf_class = elf_class
+
+        (_, _, _, _, phoff, shoff, _, _, phentsize, phnum, shentsize, shnum,
+         shstrndx) = struct.unpack_from(endian + ehdr, data, 16)
+
+        shdr_struct = struct.Struct(endian + shdr)
+        headers = []
+        if shoff:
+            # Extended numbering keeps the real values in section 0
+            first = shdr_struct.unpack_from(data, shoff)
+            if shnum == 0:
+                shnum = first[5]
+            if shstrndx == SHN_XINDEX:
+                shstrndx = first[6]
+            for i in range(shnum):
+                headers.append(shdr_struct.unpack_from(data, shoff + i * shentsize))
+
+        phdr_struct = struct.Struct(endian + phdr)
+        self.segments = []
+        for i in range(phnum):
+            fields = phdr_struct.unpack_from(data, phoff + i * phentsize)
+            if elf_class == ELFCLASS32:
+                p_type, offset, vaddr, paddr, filesz, memsz, _, _ = fields
+            else:
+                p_type, _, offset, vaddr, paddr, filesz, memsz, _ = fields
+            self.segments.append((p_type, offset, vaddr, paddr, filesz, memsz))
+
+        strtab_offset = headers[shstrndx][4] if shstrndx < len(headers) else None
+        self.sections = []
+        for (name, sh_type, flags, addr, offset, size, link, _, _, _) in headers:
+            if strtab_offset is not None:
+                name = self._string(strtab_offset + name)
+            else:
+                name = ""
+            section = Section(name, sh_type, flags, addr, offset, size, link)
+            section.load_addr = self._load_addr(section)
+            self.sections.append(section)
+
+    def _string(self, offset):
+        end = self.data.find(b"\0", offset)
+        if end < 0:
+            raise ElfError("%s has an unterminated string" % self.filename)
+        return self.data[offset:end].decode("utf-8", "replace")
+
+    def _load_addr(self, section):
+        """Translate a section's address to where it gets loaded, as given
+        by the first PT_LOAD segment containing it"""
+        for p_type, offset, vaddr, paddr, filesz, memsz in self.segments:
+            if p_type != PT_LOAD or not memsz:
+                continue
+            if not vaddr <= section.addr < vaddr + memsz:
+                continue
+            if (section.type != SHT_NOBITS and section.size and
+                not offset <= section.offset < offset + filesz):
+                continue
+            return paddr + section.addr - vaddr
+        return section.addr
+
+    def symtab(self):
+        """Get the symbol table section, None if the file is stripped"""
+        for section in self.sections:
+            if section.type == SHT_SYMTAB:
+                return section
+        return None
+
+    def symbol_names(self, containing=None):
+        """Iterate over the names of the symbols nm would list
+
+        @param containing If not None, only the names containing this
+            string are returned; the string table is searched before the
+            symbols are decoded, which is much faster when it isn't there
+        """
+        symtab = self.symtab()
+        if not symtab or symtab.link >= len(self.sections):
+            return
+        strtab = self.sections[symtab.link]
+
+        if containing is not None:
+            needle = containing.encode("utf-8")
+            if self.data.find(needle, strtab.offset,
+                              strtab.offset + strtab.size) < 0:
+                return
+
+        for st_name, _, _, _, _ in self._symbol_entries(symtab):
+            name = self._string(strtab.offset + st_name)
+            if containing is None or containing in name:
+                yield name
+
+    def symbols(self):
+        """Iterate over the symbols nm would list which are defined in a
+        section of the file, as Symbol objects"""
+        symtab = self.symtab()
+        if not symtab or symtab.link >= len(self.sections):
+            return
+        strtab = self.sections[symtab.link]
+
+        for st_name, value, size, st_info, shndx in self._symbol_entries(symtab):
+            if shndx == SHN_UNDEF or shndx >= SHN_LORESERVE:
+                # Undefined, absolute or common symbols
+                continue
+            if shndx >= len(self.sections):
+                continue
+            yield Symbol(self._string(strtab.offset + st_name), value, size,
+                         st_info & 0xf, self.sections[shndx].name)
+
+    def _symbol_entries(self, symtab):
+        """Iterate over the named entries of a symbol table which aren't
+        sections or files, as (st_name, st_value, st_size, st_info,
+        st_shndx) tuples"""
+        sym_struct = self.sym_struct
+        for offset in range(symtab.offset + sym_struct.size,
+                            symtab.offset + symtab.size, sym_struct.size):
+            fields = sym_struct.unpack_from(self.data, offset)
+            if self.elf_class == ELFCLASS32:
+                st_name, value, size, st_info, _, shndx = fields
+            else:
+                st_name, st_info, _, shndx, value, size = fields
+            if not st_name or (st_info & 0xf) in (STT_SECTION, STT_FILE):
+                continue
+            yield st_name, value, size, st_info, shndx
+
+
+# Dump the section table in the same layout as 'objdump -h'
+if __name__ == "__main__":
+    with ElfFile(sys.argv[1]) as elf:
+        for i, s in enumerate(elf.sections[1:]):
+            print("%3d %-13s %08x  %08x  %08x" % (i, s.name, s.size, s.addr,
+                                                  s.load_addr))
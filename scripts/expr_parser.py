@@ -7,6 +7,7 @@
 import sys
 import os
 import copy
+import functools
 import threading
 import re
 
@@ -206,21 +207,200 @@ def ast_expr(ast, env):
     elif ast[0] == ":":
         return True if re.compile(ast[2]).match(ast_sym(ast[1], env)) else False
 
-mutex = threading.Lock()
+def ast_literal(ast):
+    """Convert the literal of a comparison or match ahead of evaluation
 
-def parse(expr_text, env):
-    """Given a text representation of an expression in our language,
-    use the provided environment to determine whether the expression
-    is true or false"""
+    @return The integer or compiled regular expression, or None if the
+        literal is malformed; ast_expr() only fails on those once a
+        platform actually evaluates them, so they must not be converted
+        any earlier"""
+    try:
+        if ast[0] == ":":
+            return re.compile(ast[2])
+        return int(ast[2])
+    except (ValueError, re.error):
+        return None
+
+def ast_compile(ast):
+    """Turn an AST into a function of the environment returning the same
+    result as ast_expr(), without walking the tree on every evaluation"""
+    op = ast[0]
+    if op == "not":
+        f = ast_compile(ast[1])
+        return lambda env: not f(env)
+    elif op == "or":
+        f, g = ast_compile(ast[1]), ast_compile(ast[2])
+        return lambda env: f(env) or g(env)
+    elif op == "and":
+        f, g = ast_compile(ast[1]), ast_compile(ast[2])
+        return lambda env: f(env) and g(env)
+
+    sym = ast[1]
+    if op in (">", "<", ">=", "<=", ":"):
+        literal = ast_literal(ast)
+        if literal is None:
+            # Fail the same way as ast_expr(), when evaluated
+            return lambda env: ast_expr(ast, env)
+
+    if op == "==":
+        return lambda env: ast_sym(sym, env) == ast[2]
+    elif op == "!=":
+        return lambda env: ast_sym(sym, env) != ast[2]
+    elif op == ">":
+        return lambda env: ast_sym_int(sym, env) > literal
+    elif op == "<":
+        return lambda env: ast_sym_int(sym, env) < literal
+    elif op == ">=":
+        return lambda env: ast_sym_int(sym, env) >= literal
+    elif op == "<=":
+        return lambda env: ast_sym_int(sym, env) <= literal
+    elif op == "in":
+        values = ast[2]
+        return lambda env: ast_sym(sym, env) in values
+    elif op == "exists":
+        return lambda env: True if ast_sym(sym, env) else False
+    elif op == ":":
+        return lambda env: True if literal.match(ast_sym(sym, env)) else False
+
+def ast_symbols(ast):
+    """Get the set of symbols an AST refers to"""
+    if ast[0] == "not":
+        return ast_symbols(ast[1])
+    elif ast[0] in ("or", "and"):
+        return ast_symbols(ast[1]) | ast_symbols(ast[2])
+    return set([ast[1]])
+
+def batch_sym(column, rows):
+    if column is None:
+        return ["" for r in rows]
+    return ["" if column[r] is None else str(column[r]) for r in rows]
+
+def batch_sym_int(column, rows):
+    if column is None:
+        return [0 for r in rows]
+    values = []
+    for r in rows:
+        v = column[r]
+        if v is None:
+            values.append(0)
+        elif v.startswith("0x") or v.startswith("0X"):
+            values.append(int(v, 16))
+        else:
+            values.append(int(v, 10))
+    return values
+
+def batch_env(table, row):
+    """Get the environment of one row of a table, see parse_batch()"""
+    return {sym : column[row] for sym, column in table.items()
+            if column[row] is not None}
+
+def ast_compile_batch(ast):
+    """Turn an AST into a function evaluating it over a table of
+    environments, see parse_batch()
+
+    The function takes the table and the list of row numbers to
+    evaluate, and returns the results for these rows in the same order.
+    'and' and 'or' only evaluate their right hand side on the rows where
+    ast_expr() would, so evaluation errors are the same too."""
+    op = ast[0]
+    if op == "not":
+        f = ast_compile_batch(ast[1])
+        return lambda table, rows: [not v for v in f(table, rows)]
+    elif op in ("or", "and"):
+        f, g = ast_compile_batch(ast[1]), ast_compile_batch(ast[2])
+        def short_circuit(table, rows):
+            results = f(table, rows)
+            pending = [i for i, v in enumerate(results) if bool(v) == (op == "and")]
+            if pending:
+                for i, v in zip(pending, g(table, [rows[i] for i in pending])):
+                    results[i] = v
+            return results
+        return short_circuit
+
+    sym = ast[1]
+    if op in (">", "<", ">=", "<=", ":"):
+        literal = ast_literal(ast)
+        if literal is None:
+            # Fail the same way as ast_expr(), on the first row evaluated
+            return lambda table, rows: [ast_expr(ast, batch_env(table, r))
+                                        for r in rows]
+
+    if op in ("==", "!=", "in", "exists", ":"):
+        if op == "==":
+            test = lambda v: v == ast[2]
+        elif op == "!=":
+            test = lambda v: v != ast[2]
+        elif op == "in":
+            test = lambda v: v in ast[2]
+        elif op == "exists":
+            test = lambda v: True if v else False
+        else:
+            test = lambda v: True if literal.match(v) else False
+        return lambda table, rows: [test(v) for v in batch_sym(table.get(sym), rows)]
+
+    if op == ">":
+        test = lambda v: v > literal
+    elif op == "<":
+        test = lambda v: v < literal
+    elif op == ">=":
+        test = lambda v: v >= literal
+    else:
+        test = lambda v: v <= literal
+    return lambda table, rows: [test(v) for v in batch_sym_int(table.get(sym), rows)]
 
+mutex = threading.Lock()
+
+@functools.lru_cache(maxsize=1024)
+def _parse(expr_text):
     # Like it's C counterpart, state machine is not thread-safe
     mutex.acquire()
     try:
-        ast = parser.parse(expr_text)
+        return parser.parse(expr_text)
     finally:
         mutex.release()
 
-    return ast_expr(ast, env)
+@functools.lru_cache(maxsize=1024)
+def compile_expr(expr_text):
+    """Given a text representation of an expression in our language,
+    return a function which takes an environment and determines whether
+    the expression is true or false for it
+
+    Results are cached, so compiling the same expression again is cheap.
+    The returned functions don't share any state and may be called from
+    several threads at once."""
+
+    return ast_compile(_parse(expr_text))
+
+def symbols(expr_text):
+    """Get the set of symbols an expression refers to, the only ones
+    its environments need to provide"""
+
+    return ast_symbols(_parse(expr_text))
+
+@functools.lru_cache(maxsize=1024)
+def _compile_batch(expr_text):
+    return ast_compile_batch(_parse(expr_text))
+
+def parse_batch(expr_text, table, count):
+    """Evaluate an expression over many environments at once
+
+    The environments are given as a table with a column per symbol: a
+    dictionary mapping each symbol to a list of count values, None where
+    the symbol is undefined in that environment. Only the columns for
+    the symbols returned by symbols() are needed.
+
+    @return List of count booleans, same as parse() for every environment
+    """
+
+    return [True if v else False
+            for v in _compile_batch(expr_text)(table, list(range(count)))]
+
+def parse(expr_text, env):
+    """Given a text representation of an expression in our language,
+    use the provided environment to determine whether the expression
+    is true or false"""
+
+    return compile_expr(expr_text)(env)
 
 # Just some test code
 if __name__ == "__main__":
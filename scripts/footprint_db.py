@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""SQLite database of the per-section and per-symbol sizes of builds
+
+sanitycheck --footprint-db records every binary it builds here, under the
+name of the run (by default the git revision of the tree). Run as a script
+to query it, for instance to find the symbols which grew the most between
+two runs across all boards:
+
+    footprint_db.py footprint.db diff <old run> <new run>
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instances (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id),
+    test TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    ram_size INTEGER,
+    rom_size INTEGER,
+    UNIQUE (run, test, platform)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    instance INTEGER NOT NULL REFERENCES instances(id),
+    name INTEGER NOT NULL REFERENCES names(id),
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    instance INTEGER NOT NULL REFERENCES instances(id),
+    name INTEGER NOT NULL REFERENCES names(id),
+    section INTEGER NOT NULL REFERENCES names(id),
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_instance ON sections(instance);
+CREATE INDEX IF NOT EXISTS symbols_instance ON symbols(instance);
+"""
+
+
+def default_run_name(zephyr_base):
+    """Name runs after the revision of the tree, if it is a git tree
+
+    @param zephyr_base Root of the tree
+    @return 'git describe' output, or the current time
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty", "--abbrev=12"],
+            cwd=zephyr_base, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime("%Y-%m-%d-%H%M%S")
+
+
+class FootprintDB:
+    """Footprint database opened to record the builds of one run
+
+    Recording an instance which was already recorded under the same run
+    name replaces it, so re-running a revision updates its results.
+    """
+
+    def __init__(self, filename, run):
+        """Constructor
+
+        @param filename Database file, created if it doesn't exist
+        @param run Name of the run the builds are recorded under
+        """
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.name_ids = {}
+
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO runs (name, created) "
+                              "VALUES (?, ?)", (run, time.time()))
+        self.run_id = self.conn.execute("SELECT id FROM runs WHERE name = ?",
+                                        (run,)).fetchone()[0]
+
+    def _name_id(self, name):
+        if name not in self.name_ids:
+            self.conn.execute("INSERT OR IGNORE INTO names (name) VALUES (?)",
+                              (name,))
+            self.name_ids[name] = self.conn.execute(
+                "SELECT id FROM names WHERE name = ?", (name,)).fetchone()[0]
+        return self.name_ids[name]
+
+    def add(self, test, platform, ram_size, rom_size, sections, symbols):
+        """Record the footprint of a build
+
+        May be called from any thread.
+
+        @param test Test case name
+        @param platform Platform name
+        @param ram_size Total RAM size
+        @param rom_size Total ROM size
+        @param sections List of (name, type, size) tuples
+        @param symbols List of (name, section name, size) tuples
+        """
+        with self.lock, self.conn:
+            c = self.conn
+            row = c.execute("SELECT id FROM instances WHERE run = ? AND "
+                            "test = ? AND platform = ?",
+                            (self.run_id, test, platform)).fetchone()
+            if row:
+                c.execute("DELETE FROM sections WHERE instance = ?", row)
+                c.execute("DELETE FROM symbols WHERE instance = ?", row)
+                c.execute("DELETE FROM instances WHERE id = ?", row)
+
+            instance = c.execute("INSERT INTO instances (run, test, platform, "
+                                 "ram_size, rom_size) VALUES (?, ?, ?, ?, ?)",
+                                 (self.run_id, test, platform, ram_size,
+                                  rom_size)).lastrowid
+            c.executemany("INSERT INTO sections VALUES (?, ?, ?, ?)",
+                          [(instance, self._name_id(name), stype, size)
+                           for name, stype, size in sections])
+            c.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?)",
+                          [(instance, self._name_id(name),
+                            self._name_id(section), size)
+                           for name, section, size in symbols])
+
+    def close(self):
+        self.conn.close()
+
+
+def list_runs(conn):
+    """Get the runs in a database, oldest first
+
+    @param conn sqlite3 connection
+    @return List of (name, creation time, number of instances) tuples
+    """
+    return conn.execute("SELECT runs.name, runs.created, COUNT(instances.id) "
+                        "FROM runs LEFT JOIN instances "
+                        "ON instances.run = runs.id "
+                        "GROUP BY runs.id ORDER BY runs.created").fetchall()
+
+
+def growth(conn, old_run, new_run, table="symbols", top=20, platform=None,
+           test=None):
+    """Find the symbols or sections whose size changed the most between
+    two runs, summed over every test instance built in both
+
+    @param conn sqlite3 connection
+    @param old_run Name of the baseline run
+    @param new_run Name of the run to compare against the baseline
+    @param table "symbols" or "sections"
+    @param top Number of results, the largest growths come first; if
+        negative, the largest shrinks come first instead
+    @param platform If not None, only compare builds for this platform
+    @param test If not None, only compare builds of this test case
+    @return List of (name, total size delta, number of instances in which
+        the size changed, largest delta in one instance) tuples
+    """
+    if table not in ("symbols", "sections"):
+        raise ValueError("unknown table %s" % table)
+
+    run_ids = []
+    for run in (old_run, new_run):
+        row = conn.execute("SELECT id FROM runs WHERE name = ?",
+                           (run,)).fetchone()
+        if not row:
+            raise ValueError("no run named %s" % run)
+        run_ids.append(row[0])
+
+    conditions = ""
+    params = list(run_ids)
+    if platform:
+        conditions += " AND a.platform = ?"
+        params.append(platform)
+    if test:
+        conditions += " AND a.test = ?"
+        params.append(test)
+
+    query = """
+    WITH pairs AS (
+        SELECT a.id AS old, b.id AS new FROM instances a
+        JOIN instances b ON a.test = b.test AND a.platform = b.platform
+        WHERE a.run = ? AND b.run = ?{conditions}
+    ), sizes AS (
+        SELECT pairs.new AS pair, t.name AS name, t.size AS size
+        FROM pairs JOIN {table} t ON t.instance = pairs.new
+        UNION ALL
+        SELECT pairs.new, t.name, -t.size
+        FROM pairs JOIN {table} t ON t.instance = pairs.old
+    ), deltas AS (
+        SELECT name, SUM(size) AS delta FROM sizes GROUP BY pair, name
+    )
+    SELECT names.name, SUM(delta) AS total, COUNT(*),
+           {extreme}(delta)
+    FROM deltas JOIN names ON names.id = deltas.name
+    WHERE delta != 0
+    GROUP BY deltas.name
+    ORDER BY total {order} LIMIT ?
+    """.format(conditions=conditions, table=table,
+               extreme="MAX" if top >= 0 else "MIN",
+               order="DESC" if top >= 0 else "ASC")
+    params.append(abs(top))
+    return conn.execute(query, params).fetchall()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+            description="Query the footprint database written by "
+                        "sanitycheck --footprint-db")
+    parser.add_argument("database", help="Footprint database file")
+    sub = parser.add_subparsers(dest="command")
+    sub.required = True
+
+    sub.add_parser("runs", help="List the recorded runs")
+
+    diff = sub.add_parser("diff",
+            help="Show the symbols which grew the most between two runs, "
+                 "summed over every test and platform built by both")
+    diff.add_argument("old", help="Name of the baseline run")
+    diff.add_argument("new", help="Name of the run to compare")
+    diff.add_argument("-n", "--top", type=int, default=20,
+            help="Number of symbols to show, default %(default)s")
+    diff.add_argument("-s", "--shrinking", action="store_true",
+            help="Show the symbols which shrank the most instead")
+    diff.add_argument("--sections", action="store_true",
+            help="Compare section sizes instead of symbol sizes")
+    diff.add_argument("-p", "--platform",
+            help="Only compare the builds for this platform")
+    diff.add_argument("-t", "--test",
+            help="Only compare the builds of this test case")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.database):
+        sys.exit("%s does not exist" % args.database)
+    conn = sqlite3.connect(args.database)
+
+    if args.command == "runs":
+        for name, created, count in list_runs(conn):
+            print("{:<30} {} {:>6} builds".format(
+                  name, time.strftime("%Y-%m-%d %H:%M:%S",
+                                      time.localtime(created)), count))
+        return
+
+    try:
+        rows = growth(conn, args.old, args.new,
+                      "sections" if args.sections else "symbols",
+                      -args.top if args.shrinking else args.top,
+                      args.platform, args.test)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    print("{:>10} {:>6} {:>8}  {}".format("delta", "builds", "largest",
+                                          "section" if args.sections else "symbol"))
+    for name, total, count, extreme in rows:
+        print("{:>+10} {:>6} {:>+8}  {}".format(total, count, extreme, name))
+
+
+if __name__ == "__main__":
+    main()
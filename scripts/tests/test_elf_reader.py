@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Check elf_reader against readelf on binaries built by the host compiler
+
+Run with 'python3 -m unittest discover scripts/tests'.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import elf_reader
+
+SOURCE = """
+int counter;
+static int table[64] = { 1 };
+const char banner[] = "hello";
+
+static int helper(int x)
+{
+    return table[x & 63] + x;
+}
+
+int main(void)
+{
+    counter += helper(counter);
+    return banner[counter & 3];
+}
+"""
+
+SECTION_RE = re.compile(r"^\s*\[\s*(\d+)\]\s+(\S+)\s+\S+\s+([0-9a-f]+)\s+"
+                        r"([0-9a-f]+)\s+([0-9a-f]+)\s")
+SYMBOL_RE = re.compile(r"^\s*\d+:\s+([0-9a-f]+)\s+(\d+|0x[0-9a-f]+)\s+(\S+)\s+"
+                       r"\S+\s+\S+\s+(\S+)\s+(\S+)$")
+
+
+def readelf(*args):
+    return subprocess.check_output(["readelf", "-W"] + list(args)).decode()
+
+
+@unittest.skipUnless(shutil.which("cc") and shutil.which("readelf"),
+                     "needs a host C compiler and readelf")
+class TestElfReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def build(self, *cflags):
+        src = os.path.join(self.tmpdir, "test.c")
+        binary = os.path.join(self.tmpdir, "test%s.elf" % len(cflags))
+        with open(src, "w") as fp:
+            fp.write(SOURCE)
+        try:
+            subprocess.check_call(["cc"] + list(cflags) + ["-o", binary, src],
+                                  stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            self.skipTest("cc can't build with %s" % " ".join(cflags))
+        return binary
+
+    def check_sections(self, binary):
+        expected = []
+        for line in readelf("-S", binary).splitlines():
+            m = SECTION_RE.match(line)
+            if m and m.group(1) != "0":
+                expected.append((m.group(2), int(m.group(5), 16),
+                                 int(m.group(3), 16), int(m.group(4), 16)))
+        self.assertTrue(expected)
+
+        with elf_reader.ElfFile(binary) as elf:
+            sections = [(s.name, s.size, s.addr, s.offset)
+                        for s in elf.sections[1:]]
+        self.assertEqual(sections, expected)
+
+    def check_symbols(self, binary):
+        expected = set()
+        in_symtab = False
+        for line in readelf("-s", binary).splitlines():
+            if line.startswith("Symbol table"):
+                in_symtab = "'.symtab'" in line
+                continue
+            m = SYMBOL_RE.match(line)
+            if not in_symtab or not m:
+                continue
+            value, size, sym_type, ndx, name = m.groups()
+            if not ndx.isdigit() or sym_type in ("SECTION", "FILE"):
+                continue
+            expected.add((name, int(value, 16), int(size, 0)))
+        self.assertTrue(expected)
+
+        with elf_reader.ElfFile(binary) as elf:
+            symbols = set((s.name, s.value, s.size) for s in elf.symbols())
+            names = set(elf.symbol_names())
+            self.assertEqual(set(elf.symbol_names("helper")), {"helper"})
+            self.assertEqual(list(elf.symbol_names("no_such_symbol")), [])
+        self.assertEqual(symbols, expected)
+        self.assertTrue(set(name for name, _, _ in expected) <= names)
+
+    def test_native(self):
+        binary = self.build()
+        self.check_sections(binary)
+        self.check_symbols(binary)
+
+    def test_32bit(self):
+        # Linking 32-bit binaries needs multilib, converting an object
+        # file only needs binutils
+        obj = self.build("-c")
+        binary = os.path.join(self.tmpdir, "test32.o")
+        try:
+            subprocess.check_call(["objcopy", "-O", "elf32-i386", obj, binary],
+                                  stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            self.skipTest("objcopy can't produce elf32-i386")
+        with elf_reader.ElfFile(binary) as elf:
+            self.assertEqual(elf.elf_class, elf_reader.ELFCLASS32)
+        self.check_sections(binary)
+        self.check_symbols(binary)
+
+    def test_stripped(self):
+        binary = self.build("-s")
+        with elf_reader.ElfFile(binary) as elf:
+            self.assertIsNone(elf.symtab())
+            self.assertEqual(list(elf.symbols()), [])
+
+    def test_not_elf(self):
+        for contents in (b"", b"#!/bin/sh\n", b"\x7fELF\x09\x01"):
+            fn = os.path.join(self.tmpdir, "bad")
+            with open(fn, "wb") as fp:
+                fp.write(contents)
+            with self.assertRaises(elf_reader.ElfError):
+                elf_reader.ElfFile(fn)
+
+    def test_truncated(self):
+        binary = self.build()
+        with open(binary, "rb") as fp:
+            header = fp.read(40)
+        fn = os.path.join(self.tmpdir, "truncated")
+        with open(fn, "wb") as fp:
+            fp.write(header)
+        with self.assertRaises(elf_reader.ElfError):
+            elf_reader.ElfFile(fn)
+
+
+if __name__ == "__main__":
+    unittest.main()
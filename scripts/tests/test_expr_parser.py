@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Check that the compiled and batch evaluators of expr_parser give the
+same results, and fail the same way, as walking the AST with ast_expr()
+
+Run with 'python3 -m unittest discover scripts/tests'.
+"""
+
+import configparser
+import os
+import random
+import re
+import sys
+import unittest
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ZEPHYR_BASE = os.path.dirname(SCRIPTS)
+sys.path.insert(0, SCRIPTS)
+
+import expr_parser
+
+# Values given to the symbols of the environments, None is undefined
+VALUES = [None, "y", "0", "1", "42", "0x10", "x86", "arm", "qemu_x86", "foo"]
+
+
+def tree_filters():
+    """Get the filter expressions of every test case in the tree"""
+    filters = set()
+    for top in ("tests", "samples"):
+        for dirpath, _, filenames in os.walk(os.path.join(ZEPHYR_BASE, top)):
+            if "testcase.ini" not in filenames:
+                continue
+            cp = configparser.ConfigParser(interpolation=None)
+            cp.read(os.path.join(dirpath, "testcase.ini"))
+            for section in cp.sections():
+                if cp.has_option(section, "filter"):
+                    filters.add(cp.get(section, "filter"))
+    return sorted(filters)
+
+
+def outcome(f, *args):
+    """Result of a call as ("ok", bool) or ("error", exception type)"""
+    try:
+        return ("ok", True if f(*args) else False)
+    except Exception as e:
+        return ("error", type(e))
+
+
+def environments(symbols, count, rng):
+    envs = []
+    for _ in range(count):
+        env = {}
+        for sym in symbols:
+            value = rng.choice(VALUES)
+            if value is not None:
+                env[sym] = value
+        envs.append(env)
+    return envs
+
+
+def table_of(symbols, envs):
+    return {sym : [env.get(sym) for env in envs] for sym in symbols}
+
+
+class TestCompiledFilters(unittest.TestCase):
+
+    def check(self, expr_text, envs):
+        ast = expr_parser.parser.parse(expr_text)
+        symbols = expr_parser.symbols(expr_text)
+        compiled = expr_parser.compile_expr(expr_text)
+
+        expected = [outcome(expr_parser.ast_expr, ast, env) for env in envs]
+        for env, exp in zip(envs, expected):
+            self.assertEqual(outcome(compiled, env), exp,
+                             "%s with %s" % (expr_text, env))
+
+        table = table_of(symbols, envs)
+        errors = set(e for kind, e in expected if kind == "error")
+        if errors:
+            with self.assertRaises(tuple(errors), msg=expr_text):
+                expr_parser.parse_batch(expr_text, table, len(envs))
+        else:
+            self.assertEqual(expr_parser.parse_batch(expr_text, table,
+                                                     len(envs)),
+                             [value for _, value in expected], expr_text)
+
+        # Rows which don't fail must also be right when evaluated apart
+        # from the failing ones
+        good = [env for env, (kind, _) in zip(envs, expected) if kind == "ok"]
+        if good:
+            self.assertEqual(expr_parser.parse_batch(expr_text,
+                                                     table_of(symbols, good),
+                                                     len(good)),
+                             [value for kind, value in expected
+                              if kind == "ok"], expr_text)
+
+    def test_tree_filters(self):
+        filters = tree_filters()
+        self.assertTrue(filters)
+        rng = random.Random(0)
+        for expr_text in filters:
+            symbols = sorted(expr_parser.symbols(expr_text))
+            self.check(expr_text, environments(symbols, 50, rng))
+
+    def test_operators(self):
+        rng = random.Random(1)
+        for expr_text in ['A == "y"', 'A != "foo"', "A > 1", "A < 0x20",
+                          "A >= 42", "A <= 0", 'A in ["x86", "arm"]', "A",
+                          'A : "qemu.*"', "not A", "A and B or not C",
+                          "(A or B) and C > 10", 'A == 1 and B : "^x"']:
+            symbols = sorted(expr_parser.symbols(expr_text))
+            self.check(expr_text, environments(symbols, 50, rng))
+
+    def test_malformed_regex(self):
+        """A malformed regex only fails for the environments which
+        evaluate it, not when the expression is compiled"""
+        expr_text = 'ARCH == "x86" or PLATFORM : "["'
+        compiled = expr_parser.compile_expr(expr_text)
+        self.assertTrue(compiled({"ARCH" : "x86"}))
+        with self.assertRaises(re.error):
+            compiled({"ARCH" : "arm"})
+
+        table = {"ARCH" : ["x86", "x86"], "PLATFORM" : ["a", "b"]}
+        self.assertEqual(expr_parser.parse_batch(expr_text, table, 2),
+                         [True, True])
+        table = {"ARCH" : ["x86", "arm"], "PLATFORM" : ["a", "b"]}
+        with self.assertRaises(re.error):
+            expr_parser.parse_batch(expr_text, table, 2)
+
+    def test_malformed_integer(self):
+        """Same for an integer literal the lexer wouldn't produce"""
+        ast = ("or", ("exists", "A"), ("<", "B", "abc"))
+        compiled = expr_parser.ast_compile(ast)
+        self.assertTrue(compiled({"A" : "y"}))
+        with self.assertRaises(ValueError):
+            compiled({})
+
+        batch = expr_parser.ast_compile_batch(ast)
+        self.assertEqual(batch({"A" : ["y"], "B" : [None]}, [0]), [True])
+        with self.assertRaises(ValueError):
+            batch({"A" : ["y", None], "B" : [None, "1"]}, [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Check recording builds in footprint_db and querying the growth
+between runs
+
+Run with 'python3 -m unittest discover scripts/tests'.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import footprint_db
+
+
+class TestFootprintDB(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "footprint.db")
+
+    def record(self, run, builds):
+        """Record a run
+
+        @param builds Dictionary mapping (test, platform) to a dictionary
+            of symbol name to (section, size)
+        """
+        db = footprint_db.FootprintDB(self.filename, run)
+        for (test, platform), symbols in builds.items():
+            sections = {}
+            for section, size in symbols.values():
+                sections[section] = sections.get(section, 0) + size
+            db.add(test, platform, 0, sum(sections.values()),
+                   [(name, "PROGBITS", size) for name, size in sections.items()],
+                   [(name, section, size)
+                    for name, (section, size) in symbols.items()])
+        db.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.filename)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_growth(self):
+        self.record("old", {
+            ("t1", "p1") : {"a" : (".text", 100), "b" : (".text", 50),
+                            "c" : (".data", 8)},
+            ("t1", "p2") : {"a" : (".text", 100)},
+            ("t2", "p1") : {"a" : (".text", 10)},
+        })
+        self.record("new", {
+            ("t1", "p1") : {"a" : (".text", 130), "b" : (".text", 40),
+                            "d" : (".data", 4)},
+            ("t1", "p2") : {"a" : (".text", 110)},
+            # Only built by the new run, left out of the comparison
+            ("t3", "p1") : {"a" : (".text", 1000)},
+        })
+        conn = self.connect()
+
+        self.assertEqual(footprint_db.growth(conn, "old", "new"),
+                         [("a", 40, 2, 30), ("d", 4, 1, 4),
+                          ("c", -8, 1, -8), ("b", -10, 1, -10)])
+        self.assertEqual(footprint_db.growth(conn, "old", "new", top=-2),
+                         [("b", -10, 1, -10), ("c", -8, 1, -8)])
+        self.assertEqual(footprint_db.growth(conn, "old", "new", top=1,
+                                             platform="p2"),
+                         [("a", 10, 1, 10)])
+        self.assertEqual(footprint_db.growth(conn, "old", "new",
+                                             table="sections", test="t1"),
+                         [(".text", 30, 2, 20), (".data", -4, 1, -4)])
+        self.assertEqual(footprint_db.growth(conn, "new", "new"), [])
+
+        with self.assertRaises(ValueError):
+            footprint_db.growth(conn, "old", "missing")
+        with self.assertRaises(ValueError):
+            footprint_db.growth(conn, "old", "new", table="instances")
+
+    def test_rerecord(self):
+        """Recording a build again under the same run replaces it"""
+        self.record("run", {("t1", "p1") : {"a" : (".text", 100)}})
+        self.record("run", {("t1", "p1") : {"b" : (".text", 20)},
+                            ("t2", "p1") : {"a" : (".text", 10)}})
+        conn = self.connect()
+
+        self.assertEqual([(name, count) for name, _, count in
+                          footprint_db.list_runs(conn)], [("run", 2)])
+        self.assertEqual(conn.execute(
+            "SELECT names.name, size FROM symbols JOIN instances "
+            "ON symbols.instance = instances.id JOIN names "
+            "ON names.id = symbols.name WHERE test = 't1'").fetchall(),
+            [("b", 20)])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sections")
+                         .fetchone()[0], 2)
+
+    def test_list_runs(self):
+        self.record("first", {("t1", "p1") : {"a" : (".text", 1)}})
+        self.record("second", {})
+        conn = self.connect()
+        self.assertEqual([(name, count) for name, _, count in
+                          footprint_db.list_runs(conn)],
+                         [("first", 1), ("second", 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
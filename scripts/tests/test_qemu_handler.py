@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Check when sanitycheck gives up on QEMU sessions which went quiet
+
+Run with 'python3 -m unittest discover scripts/tests'.
+"""
+
+import importlib.machinery
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("ZEPHYR_BASE", os.path.dirname(SCRIPTS))
+
+
+def load_sanitycheck():
+    loader = importlib.machinery.SourceFileLoader(
+            "sanitycheck", os.path.join(SCRIPTS, "sanitycheck"))
+    spec = importlib.util.spec_from_loader("sanitycheck", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+sanitycheck = load_sanitycheck()
+QEMUHandler = sanitycheck.QEMUHandler
+
+
+class TestInactivityPeriod(unittest.TestCase):
+
+    def test_unscaled(self):
+        self.assertIsNone(QEMUHandler.inactivity_period(None, None, 5))
+        self.assertEqual(QEMUHandler.inactivity_period(30, None, 5), 30)
+        # Never run before
+        self.assertIsNone(QEMUHandler.inactivity_period(None, 3, None))
+        self.assertEqual(QEMUHandler.inactivity_period(30, 3, None), 30)
+
+    def test_scaled(self):
+        self.assertEqual(QEMUHandler.inactivity_period(5, 3, 10), 30)
+        self.assertEqual(QEMUHandler.inactivity_period(None, 3, 10), 30)
+
+    def test_scaled_floor(self):
+        # A test that ran quickly last time isn't given a period shorter
+        # than the inactivity timeout, or the built-in minimum
+        self.assertEqual(QEMUHandler.inactivity_period(5, 3, 0.3), 5)
+        self.assertEqual(QEMUHandler.inactivity_period(None, 3, 0.3),
+                         QEMUHandler.MIN_INACTIVITY)
+
+
+class TestQuietSession(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.outdir)
+        self.handler = QEMUHandler("test", self.outdir,
+                                   os.path.join(self.outdir, "qemu.log"), 100)
+        self.handler.inactivity = 2
+
+    def start_qemu(self):
+        with open(self.handler.pid_fn, "w") as fp:
+            # No such process, finish() has nothing to kill
+            fp.write("0x")
+
+    def test_startup_is_not_inactivity(self):
+        h = self.handler
+        h.open()
+        self.addCleanup(h.finish, "passed")
+        start = h.start_time
+
+        # 'make run' still building, however long it takes
+        self.assertIsNone(h.expired(start + 50))
+        self.assertLessEqual(h.deadline(),
+                             time.time() + QEMUHandler.START_POLL)
+
+        self.start_qemu()
+        self.assertIsNone(h.expired(start + 60))
+        self.assertIsNone(h.expired(start + 61.9))
+        self.assertEqual(h.expired(start + 62), "inactive")
+        self.assertEqual(h.deadline(), start + 62)
+        self.assertEqual(h.expired(start + 100), "timeout")
+
+    def test_output_starts_the_clock(self):
+        h = self.handler
+        h.open()
+        self.addCleanup(h.finish, "passed")
+
+        self.assertIsNone(h.feed(b"booting\n"))
+        self.assertIsNotNone(h.last_output)
+        self.assertIsNone(h.expired(h.last_output + 1))
+        self.assertEqual(h.expired(h.last_output + 2), "inactive")
+
+    def test_monitor(self):
+        """A slow start followed by a hang, through the QEMUMonitor"""
+        h = self.handler
+        h.inactivity = 0.5
+        monitor = sanitycheck.QEMUMonitor()
+        monitor.start(h)
+
+        # Longer than the inactivity period
+        time.sleep(1)
+        self.assertFalse(h.done.is_set())
+
+        self.start_qemu()
+        fd = os.open(h.fifo_fn + ".out", os.O_WRONLY)
+        os.write(fd, b"***** Booting Zephyr OS *****\n")
+        self.assertTrue(h.done.wait(5))
+        os.close(fd)
+        self.assertEqual(h.get_state()[0], "inactive")
+        self.assertGreaterEqual(h.get_state()[1]["qemu_time"], 1.5)
+        monitor.stop(h)
+        monitor.close()
+
+    def test_monitor_error(self):
+        """An error processing a session's output fails that session
+        without taking the monitor down"""
+        h = self.handler
+        other = QEMUHandler("other", self.outdir,
+                            os.path.join(self.outdir, "other.log"), 100)
+        other.fifo_fn = os.path.join(self.outdir, "other-fifo")
+        monitor = sanitycheck.QEMUMonitor()
+        self.addCleanup(monitor.close)
+
+        def feed(data):
+            raise RuntimeError("broken")
+        h.feed = feed
+        monitor.start(h)
+        monitor.start(other)
+
+        fd = os.open(h.fifo_fn + ".out", os.O_WRONLY)
+        os.write(fd, b"output\n")
+        self.assertTrue(h.done.wait(5))
+        os.close(fd)
+        self.assertEqual(h.get_state()[0], "monitor error")
+
+        fd = os.open(other.fifo_fn + ".out", os.O_WRONLY)
+        os.write(fd, QEMUHandler.RUN_PASSED.encode() + b"\n")
+        self.assertTrue(other.done.wait(5))
+        os.close(fd)
+        self.assertEqual(other.get_state()[0], "passed")
+        monitor.stop(h)
+        monitor.stop(other)
+
+    def test_monitor_thread_died(self):
+        """stop() doesn't wait forever once the monitor thread is gone"""
+        monitor = sanitycheck.QEMUMonitor()
+        self.addCleanup(monitor.close)
+        monitor._request("exit", None)
+        monitor.thread.join()
+
+        monitor.start(self.handler)
+        monitor.stop(self.handler)
+        self.assertEqual(self.handler.get_state()[0], "monitor error")
+
+
+if __name__ == "__main__":
+    unittest.main()